@@ -475,7 +475,8 @@ def generate_shap_explanations(df, model, event_id=None):
                 logger.error("anomaly_score column not found. Run model training first.")
                 return None
                 
-            highest_risk_event = df.sort_values(by='anomaly_score', ascending=False).iloc[0]
+            # idxmax is a single O(N) pass; no need to sort the whole frame
+            highest_risk_event = df.loc[df['anomaly_score'].idxmax()]
             event_id = highest_risk_event['event_id']
             X_explain = highest_risk_event[MODEL_FEATURES].to_frame().T 
 
@@ -1,7 +1,12 @@
+import os
+import sys
 import pandas as pd
 
-# Load processed data
-df = pd.read_csv('data/processed_features.csv')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.data_io import attach_anomaly_scores
+
+# Load processed data (anomaly scores live in the training sidecar file)
+df = attach_anomaly_scores(pd.read_csv('data/processed_features.csv'))
 
 print("="*60)
 print("VORTEX DATA STATISTICS")
@@ -19,6 +19,8 @@ MODEL_DIR.mkdir(exist_ok=True)
 # --- File Paths (Convert to strings for backward compatibility) ---
 RAW_DATA_FILE = str(DATA_DIR / 'raw_behavior_logs.csv')
 PROCESSED_DATA_FILE = str(DATA_DIR / 'processed_features.csv')
+PROCESSED_DATA_PARQUET = str(DATA_DIR / 'processed_features.parquet')  # Columnar mirror for fast loads
+ANOMALY_SCORES_FILE = str(DATA_DIR / 'anomaly_scores.parquet')  # event_id -> anomaly_score sidecar
 PREDICTIONS_DATA_FILE = str(DATA_DIR / 'processed_features_predictions.csv')
 MODEL_FILE = str(MODEL_DIR / 'isolation_forest_model.pkl')
 DB_FILE = str(DATA_DIR / 'vortex.db')
@@ -38,7 +40,16 @@ NORMAL_END_TIME = time(18, 0, 0)
 
 # --- Model Training Parameters ---
 CONTAMINATION = ANOMALY_RATE  # Alias for consistency
-N_ESTIMATORS = 100
+# Tree cost scales with n_estimators x max_samples. AUC-ROC from
+#   python -m src.model_train --sweep-estimators
+# on four generated datasets (~113k-121k events, max_samples=256):
+#   n_estimators   25: 0.906 / 0.925 / 0.907 / 0.936  (mean 0.919)
+#   n_estimators   50: 0.938 / 0.927 / 0.925 / 0.950  (mean 0.935)
+#   n_estimators   75: 0.926 / 0.918 / 0.915 / 0.934  (mean 0.923)
+#   n_estimators  100: 0.922 / 0.934 / 0.915 / 0.931  (mean 0.926)
+#   n_estimators  150: 0.932 / 0.943 / 0.923 / 0.934  (mean 0.933)
+# Past 50 trees the differences are within run-to-run noise.
+N_ESTIMATORS = 50
 MAX_SAMPLES = 256
 RANDOM_STATE = 42
 
@@ -37,7 +37,8 @@ except ImportError:
 from src.xai_explainer import xai_pipeline, load_data_and_model
 from src.data_generator import generate_synthetic_logs
 from src.feature_engineer import feature_engineering_pipeline
-from src.model_train import model_training_pipeline, MODEL_FEATURES
+from src.model_train import model_training_pipeline, train_isolation_forest, save_model
+from src.data_io import MODEL_FEATURES, attach_anomaly_scores
 from src.user_profile import UserProfile, UserProfileManager, GlobalOrgBaseline, initialize_profile_manager, get_profile_manager
 from src.risk_trajectory import RiskTrajectory, TrajectoryManager, initialize_trajectory_manager, get_trajectory_manager
 from src.event_chains import EventChainDetector, ChainDetectorManager, initialize_chain_detector, get_chain_detector_manager
@@ -379,15 +380,9 @@ class DataStore:
             if self.model is None and self.df is not None:
                 logger.warning("⚠️ Model not found — auto-retraining from in-memory data...")
                 try:
-                    from sklearn.ensemble import IsolationForest
-                    import joblib as _joblib
                     _X = self.df[MODEL_FEATURES].fillna(0)
-                    _model = IsolationForest(
-                        contamination=0.05, random_state=42, n_estimators=100, n_jobs=-1
-                    )
-                    _model.fit(_X)
-                    os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
-                    _joblib.dump(_model, MODEL_FILE)
+                    _model = train_isolation_forest(_X)
+                    save_model(_model)
                     self.model = _model
                     logger.info("✅ Model auto-retrained and saved successfully")
                 except Exception as retrain_err:
@@ -480,6 +475,7 @@ def load_processed_data():
         return None
 
     df = pd.read_csv(PROCESSED_DATA_FILE, low_memory=False)
+    df = attach_anomaly_scores(df)
     
     # Risk categorization
     q_low = df['anomaly_score'].quantile(0.80)
@@ -1651,10 +1647,11 @@ def pipeline_engineer_features():
         raise HTTPException(status_code=500, detail=f"Feature engineering failed: {str(e)}")
 
 @app.post("/pipeline/train-model", response_model=PipelineStatus, summary="Train Anomaly Detection Model")
-def pipeline_train_model():
+def pipeline_train_model(force: bool = False):
     """
     Triggers model training pipeline.
-    This trains the Isolation Forest model and saves it.
+    This trains the Isolation Forest model and saves it. The saved model is
+    reused when the data and hyperparameters are unchanged, unless force=true.
     """
     if not os.path.exists(PROCESSED_DATA_FILE):
         raise HTTPException(
@@ -1664,15 +1661,20 @@ def pipeline_train_model():
     
     try:
         logger.info("Starting model training...")
-        model_training_pipeline()
+        retrained = model_training_pipeline(force_retrain=force)
         
         # Reload data and model
         data_store.reload()
         
+        if retrained:
+            message = f"Successfully trained model at {MODEL_FILE}"
+        else:
+            message = f"Training data unchanged, reused model at {MODEL_FILE}"
+        
         return PipelineStatus(
             task="train_model",
             status="completed",
-            message=f"Successfully trained model at {MODEL_FILE}",
+            message=message,
             timestamp=datetime.now().isoformat()
         )
     except Exception as e:
@@ -1710,11 +1712,11 @@ def pipeline_run_all():
         
         # Step 3: Train Model
         logger.info("Pipeline Step 3: Training model...")
-        model_training_pipeline()
+        retrained = model_training_pipeline()
         results.append(PipelineStatus(
             task="train_model",
             status="completed",
-            message="Model training successful",
+            message="Model training successful" if retrained else "Training data unchanged, model reused",
             timestamp=datetime.now().isoformat()
         ))
         
@@ -0,0 +1,120 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import pyarrow.parquet as pq
+
+# --- PATH CORRECTION ---
+try:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.join(current_dir, '..')
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+except NameError:
+    pass
+
+# Import configuration (try secure config first, fallback to basic)
+try:
+    from config_secure import settings
+    PROCESSED_DATA_PARQUET = str(settings.PROCESSED_DATA_PARQUET)
+    ANOMALY_SCORES_FILE = str(settings.ANOMALY_SCORES_FILE)
+except ImportError:
+    from config import PROCESSED_DATA_PARQUET, ANOMALY_SCORES_FILE
+
+# Define the features to be used for training the Isolation Forest model
+MODEL_FEATURES = [
+    'sensitive_file_access',
+    'external_ip_connection',
+    'is_weekend',
+    'is_off_hours',
+    'sin_hour',
+    'cos_hour',
+    'file_access_count_zscore',
+    'upload_size_mb_zscore',
+    'total_files_24h_zscore',
+    'avg_upload_24h_zscore',
+    'event_count_24h_zscore',
+    'is_unusual_login',
+    'privilege_escalation',
+    'admin_action'
+]
+
+def read_processed_features(filepath, columns=None, parquet_path=PROCESSED_DATA_PARQUET,
+                            feature_dtype=None):
+    """
+    Reads the processed feature table, preferring its columnar Parquet mirror.
+
+    The mirror is only trusted while it is at least as new as the CSV, since
+    other stages (e.g. the threat simulator) still append to the CSV directly.
+
+    Args:
+        filepath: Path to the processed features CSV
+        columns: Optional list of columns to load; the rest are never decoded
+        parquet_path: Path to the Parquet mirror
+        feature_dtype: Optional dtype for the model feature columns. Training
+            passes np.float32 so the CSV is parsed straight to it; readers that
+            report feature values keep the default float64, whose decimals
+            round-trip exactly.
+    """
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(filepath):
+        if columns is not None:
+            # Parquet rejects unknown columns; match the CSV usecols behaviour
+            available = set(pq.read_schema(parquet_path).names)
+            columns = [c for c in columns if c in available]
+        df = pd.read_parquet(parquet_path, columns=columns)
+        if feature_dtype is not None:
+            df = df.astype({c: feature_dtype for c in MODEL_FEATURES if c in df.columns})
+        return df
+
+    return _read_processed_csv(filepath, columns, feature_dtype)
+
+def _read_processed_csv(filepath, columns=None, feature_dtype=None):
+    """Reads the processed CSV with the multithreaded pyarrow parser."""
+    # The pyarrow engine needs explicit column lists, so resolve them from the header
+    header = pd.read_csv(filepath, nrows=0).columns
+    if columns is None:
+        usecols = list(header)
+    else:
+        wanted = set(columns)
+        usecols = [c for c in header if c in wanted]
+    dtypes = {}
+    if feature_dtype is not None:
+        dtypes = {c: feature_dtype for c in usecols if c in MODEL_FEATURES}
+
+    return pd.read_csv(filepath, usecols=usecols, dtype=dtypes, engine='pyarrow')
+
+def save_processed_parquet(df, parquet_path=PROCESSED_DATA_PARQUET):
+    """
+    Writes the Parquet mirror of the processed feature table.
+
+    Features keep their float64 dtype so the mirror returns the same values as
+    the CSV; consumers that want float32 ask for it via read_processed_features.
+    """
+    df.to_parquet(parquet_path, compression='zstd', index=False)
+    print(f"✅ Columnar copy of processed data saved to: {parquet_path}")
+
+def save_anomaly_scores(event_ids, anomaly_scores, scores_path=ANOMALY_SCORES_FILE):
+    """Persists anomaly scores as a small event_id -> anomaly_score sidecar file."""
+    scores_df = pd.DataFrame({
+        'event_id': np.asarray(event_ids),
+        'anomaly_score': np.asarray(anomaly_scores)
+    })
+    scores_df.to_parquet(scores_path, compression='zstd', index=False)
+    print(f"✅ Anomaly scores saved to: {scores_path}")
+
+def attach_anomaly_scores(df, scores_path=ANOMALY_SCORES_FILE):
+    """
+    Joins the persisted anomaly scores onto a processed-feature frame by event_id.
+
+    Scores from the latest training run take precedence; events it did not score
+    (e.g. simulator-injected ones) keep any anomaly_score already in the frame.
+    """
+    if not os.path.exists(scores_path):
+        return df
+
+    scores = pd.read_parquet(scores_path).set_index('event_id')['anomaly_score']
+    latest = df['event_id'].map(scores)
+    if 'anomaly_score' in df.columns:
+        latest = latest.fillna(df['anomaly_score'])
+    df['anomaly_score'] = latest
+    return df
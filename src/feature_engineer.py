@@ -20,6 +20,7 @@ from config import (
     RAW_DATA_FILE, PROCESSED_DATA_FILE,
     TIME_WINDOW_HOURS, NORMAL_START_TIME, NORMAL_END_TIME
 )
+from src.data_io import save_processed_parquet
 
 
 def create_temporal_features(df):
@@ -141,6 +142,8 @@ def feature_engineering_pipeline():
     
     # Save the processed data
     df_processed.to_csv(PROCESSED_DATA_FILE, index=False)
+    # Columnar mirror for fast, column-pruned loads (written after the CSV)
+    save_processed_parquet(df_processed)
     
     print("-" * 50)
     print("✅ Feature Engineering Complete.")
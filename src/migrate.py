@@ -35,6 +35,7 @@ except ImportError:
     DB_FILE = str(_root / "data" / "vortex.db")
 
 from src.database import engine
+from src.data_io import attach_anomaly_scores
 
 
 # ---------------------------------------------------------------------------
@@ -48,20 +49,20 @@ def migrate_events() -> int:
 
     print(f"  Loading {PROCESSED_DATA_FILE} ...")
     df = pd.read_csv(PROCESSED_DATA_FILE, low_memory=False)
+    df = attach_anomaly_scores(df)
 
-    # Add risk_level if not present (matches main.py logic)
-    if "risk_level" not in df.columns:
-        q_low      = df["anomaly_score"].quantile(0.80)
-        q_high     = df["anomaly_score"].quantile(0.95)
-        q_critical = df["anomaly_score"].quantile(0.99)
+    # Derive risk_level from the current scores (matches main.py logic)
+    q_low      = df["anomaly_score"].quantile(0.80)
+    q_high     = df["anomaly_score"].quantile(0.95)
+    q_critical = df["anomaly_score"].quantile(0.99)
 
-        def _cat(score):
-            if score >= q_critical: return "Critical"
-            elif score >= q_high:   return "High"
-            elif score >= q_low:    return "Medium"
-            return "Low"
+    def _cat(score):
+        if score >= q_critical: return "Critical"
+        elif score >= q_high:   return "High"
+        elif score >= q_low:    return "Medium"
+        return "Low"
 
-        df["risk_level"] = df["anomaly_score"].apply(_cat)
+    df["risk_level"] = df["anomaly_score"].apply(_cat)
 
     print(f"  Writing {len(df):,} rows × {len(df.columns)} columns to SQLite ...")
     df.to_sql(
@@ -3,11 +3,14 @@ import numpy as np
 import os
 import sys
 import json
+import hashlib
 import joblib
+from concurrent.futures import ThreadPoolExecutor
+from joblib import parallel_backend, cpu_count
 from pathlib import Path
 from datetime import datetime
 from sklearn.ensemble import IsolationForest
-from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
+from sklearn.metrics import precision_recall_fscore_support, roc_auc_score, confusion_matrix
 
 # --- PATH CORRECTION ---
 try:
@@ -25,26 +28,43 @@ try:
     MODEL_FILE = str(settings.MODEL_FILE)
     MODEL_DIR = str(settings.MODEL_DIR)
     ANOMALY_RATE = settings.CONTAMINATION
+    N_ESTIMATORS = settings.N_ESTIMATORS
+    MAX_SAMPLES = settings.MAX_SAMPLES
+    RANDOM_STATE = settings.RANDOM_STATE
 except ImportError:
-    from config import PROCESSED_DATA_FILE, MODEL_FILE, MODEL_DIR, ANOMALY_RATE
-
-# Define the features to be used for training the Isolation Forest model
-MODEL_FEATURES = [
-    'sensitive_file_access',
-    'external_ip_connection',
-    'is_weekend',
-    'is_off_hours',
-    'sin_hour',
-    'cos_hour',
-    'file_access_count_zscore',
-    'upload_size_mb_zscore',
-    'total_files_24h_zscore',
-    'avg_upload_24h_zscore',
-    'event_count_24h_zscore',
-    'is_unusual_login',
-    'privilege_escalation',
-    'admin_action'
-]
+    from config import (
+        PROCESSED_DATA_FILE, MODEL_FILE, MODEL_DIR, ANOMALY_RATE, N_ESTIMATORS, MAX_SAMPLES,
+        RANDOM_STATE
+    )
+
+from src.data_io import (
+    MODEL_FEATURES, read_processed_features, save_anomaly_scores
+)
+
+# Physical cores only: hyperthreads add contention, not throughput, in tree traversal
+N_JOBS = cpu_count(only_physical_cores=True)
+
+# Isolation Forest hyperparameters (n_jobs is excluded: it does not change the fit).
+# contamination='auto' skips sklearn's scoring pass over the training set inside
+# fit(); the ANOMALY_RATE threshold is applied afterwards in train_isolation_forest.
+MODEL_PARAMS = {
+    'contamination': 'auto',
+    'random_state': RANDOM_STATE,
+    'n_estimators': N_ESTIMATORS,
+    'max_samples': MAX_SAMPLES,
+    'max_features': 1.0,
+    'bootstrap': False
+}
+
+# Fingerprint of the training input, stored next to the model artifact
+FINGERPRINT_FILE = MODEL_FILE + '.fp'
+
+# Model artifact compression: lz4 when available (fast to decode), zlib otherwise
+try:
+    import lz4  # noqa: F401
+    MODEL_COMPRESSION = ('lz4', 3)
+except ImportError:
+    MODEL_COMPRESSION = ('zlib', 3)
 
 def load_and_prepare_data(filepath):
     """Loads the processed data and separates features from metadata/labels."""
@@ -54,56 +74,87 @@ def load_and_prepare_data(filepath):
         return None, None, None
 
     print(f"Loading processed data from: {filepath}")
-    df = pd.read_csv(filepath)
+    df = read_processed_features(
+        filepath,
+        columns=MODEL_FEATURES + ['event_id', 'anomaly_flag_truth'],
+        feature_dtype=np.float32
+    )
 
-    # 1. Feature Set (X): Only include the numerical features for the model
-    X = df[MODEL_FEATURES].copy()
+    # 1. Feature Set (X): Only include the numerical features for the model.
+    # Isolation Forest does not handle NaNs, so they are filled with 0 during the
+    # single conversion to an ndarray; the frame wraps it (keeping feature names
+    # for sklearn) without another copy. float32 is the dtype sklearn's trees
+    # use internally, so fit/scoring skip their own cast and stream half the bytes.
+    X = pd.DataFrame(
+        df[MODEL_FEATURES].to_numpy(dtype=np.float32, na_value=0.0),
+        columns=MODEL_FEATURES,
+        index=df.index,
+        copy=False
+    )
     
     # 2. True Labels (y): The ground truth flag for evaluation
     y_true = df['anomaly_flag_truth']
-    
-    # Isolation Forest does not handle NaNs, fill with 0
-    X = X.fillna(0)
 
     return X, y_true, df
 
-def train_isolation_forest(X):
+def train_isolation_forest(X, return_scores=False):
     """
     Trains the Isolation Forest model for unsupervised anomaly detection.
+    
+    With return_scores=True, also returns the training-set score_samples so
+    evaluation can reuse them instead of traversing the forest again.
     """
     print("-> Training Isolation Forest Model...")
     
-    model = IsolationForest(
-        contamination=ANOMALY_RATE,
-        random_state=42,
-        n_estimators=100,
-        max_features=1.0,
-        n_jobs=-1
-    )
+    model = IsolationForest(**MODEL_PARAMS, n_jobs=N_JOBS)
 
     model.fit(X)
     
+    # Flag the ANOMALY_RATE fraction of training events as outliers. Setting
+    # offset_ keeps predict()/decision_function() consistent for every consumer.
+    with parallel_backend("threading", n_jobs=N_JOBS):
+        train_scores = model.score_samples(X)
+    model.offset_ = float(np.quantile(train_scores, ANOMALY_RATE))
+    
+    if return_scores:
+        return model, train_scores
     return model
 
-def evaluate_model(model, X, y_true):
+def evaluate_model(model, X, y_true, scores=None):
     """
     Evaluates the trained Isolation Forest model against ground truth labels.
+    
+    Args:
+        model: Trained IsolationForest model
+        X: Feature matrix
+        y_true: Ground truth labels
+        scores: Optional precomputed model.score_samples(X)
+    
+    Returns the metrics dict and the per-event anomaly scores (higher = riskier).
     """
     print("-> Evaluating Model Performance...")
     
-    # Isolation Forest predicts: 1 for inliers (normal), -1 for outliers (anomalies)
-    y_pred_if = model.predict(X)
-    y_pred_binary = np.where(y_pred_if == -1, 1, 0)
+    if scores is None:
+        # Scoring ignores the constructor's n_jobs unless a joblib backend is active
+        with parallel_backend("threading", n_jobs=N_JOBS):
+            scores = model.score_samples(X)
+    
+    # Equivalent to -decision_function(X): higher anomaly_scores mean higher risk
+    anomaly_scores = np.subtract(model.offset_, scores)
+    
+    # Isolation Forest flags outliers where decision_function < 0; reinterpret
+    # the boolean mask as 0/1 int8 labels without another allocation
+    y_pred_binary = (anomaly_scores > 0).view(np.int8)
     
     # Calculate metrics
-    anomaly_scores = model.decision_function(X)
-    auc_score = roc_auc_score(y_true, -anomaly_scores)
+    auc_score = roc_auc_score(y_true, anomaly_scores)
     
-    report = classification_report(
+    # Per-class precision/recall/F1 in a single pass (index 0: Normal, 1: Anomaly)
+    precision, recall, f1, support = precision_recall_fscore_support(
         y_true, 
         y_pred_binary, 
-        target_names=['Normal (0)', 'Anomaly (1)'], 
-        output_dict=True
+        labels=[0, 1], 
+        zero_division=0
     )
     
     cm = confusion_matrix(y_true, y_pred_binary)
@@ -111,11 +162,9 @@ def evaluate_model(model, X, y_true):
     print("-" * 50)
     print(f"Model AUC-ROC Score: {auc_score:.4f}")
     print("--- Classification Report ---")
-    print(classification_report(
-        y_true, 
-        y_pred_binary, 
-        target_names=['Normal (0)', 'Anomaly (1)']
-    ))
+    print(f"{'':>12} {'precision':>9} {'recall':>9} {'f1-score':>9} {'support':>9}")
+    for i, name in enumerate(['Normal (0)', 'Anomaly (1)']):
+        print(f"{name:>12} {precision[i]:9.2f} {recall[i]:9.2f} {f1[i]:9.2f} {support[i]:9d}")
     print("--- Confusion Matrix (True vs Predicted) ---")
     print(f"| TN | FP | \n| FN | TP |\n{cm}")
     print("-" * 50)
@@ -123,9 +172,9 @@ def evaluate_model(model, X, y_true):
     # Store metrics for persistence
     metrics = {
         'auc_roc': float(auc_score),
-        'f1_anomaly': float(report['Anomaly (1)']['f1-score']),
-        'precision_anomaly': float(report['Anomaly (1)']['precision']),
-        'recall_anomaly': float(report['Anomaly (1)']['recall']),
+        'f1_anomaly': float(f1[1]),
+        'precision_anomaly': float(precision[1]),
+        'recall_anomaly': float(recall[1]),
         'total_events': int(len(y_true)),
         'total_anomalies': int(y_true.sum()),
         'confusion_matrix': cm.tolist(),
@@ -134,11 +183,68 @@ def evaluate_model(model, X, y_true):
     
     return metrics, anomaly_scores
 
-def save_model(model):
-    """Saves the trained model using joblib."""
+def compute_training_fingerprint(X):
+    """Hashes the feature matrix and hyperparameters that fully determine the fit."""
+    values = X.to_numpy()
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        'features': list(X.columns),
+        'shape': list(values.shape),
+        'dtype': str(values.dtype),
+        'params': MODEL_PARAMS,
+        'anomaly_rate': ANOMALY_RATE
+    }, sort_keys=True).encode())
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+def load_fingerprinted_model(fingerprint):
+    """Returns the saved model if it was fitted on the same fingerprint, else None."""
+    if not (os.path.exists(MODEL_FILE) and os.path.exists(FINGERPRINT_FILE)):
+        return None
+    
+    # A model written after its fingerprint (e.g. the API auto-retrain) is not covered by it
+    if os.path.getmtime(FINGERPRINT_FILE) < os.path.getmtime(MODEL_FILE):
+        return None
+    
+    with open(FINGERPRINT_FILE) as f:
+        if f.read().strip() != fingerprint:
+            return None
+    
+    try:
+        model = joblib.load(MODEL_FILE)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not load saved model, retraining: {e}")
+        return None
+    
+    return model if isinstance(model, IsolationForest) else None
+
+def save_model(model, fingerprint=None):
+    """Saves the trained model using joblib, with the fingerprint of its training input."""
     os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
-    joblib.dump(model, MODEL_FILE)
+    joblib.dump(model, MODEL_FILE, compress=MODEL_COMPRESSION, protocol=5)
     print(f"✅ Trained Isolation Forest model saved to: {MODEL_FILE}")
+    
+    if fingerprint is not None:
+        with open(FINGERPRINT_FILE, 'w') as f:
+            f.write(fingerprint)
+
+def sweep_n_estimators(X, y_true, candidates=(25, 50, 75, 100, 150)):
+    """
+    Fits one forest per candidate n_estimators and reports its AUC-ROC, to find
+    where the score plateaus before changing N_ESTIMATORS in the config.
+    """
+    print("-> Sweeping n_estimators...")
+    results = {}
+    
+    for n in candidates:
+        model = IsolationForest(**{**MODEL_PARAMS, 'n_estimators': n}, n_jobs=N_JOBS)
+        model.fit(X)
+        with parallel_backend("threading", n_jobs=N_JOBS):
+            scores = model.score_samples(X)
+        results[n] = float(roc_auc_score(y_true, -scores))
+        print(f"   n_estimators={n:4d} -> AUC-ROC {results[n]:.4f}")
+    
+    return results
 
 def save_metrics(metrics):
     """Saves model performance metrics to JSON file."""
@@ -154,47 +260,84 @@ def save_metrics(metrics):
     except Exception as e:
         print(f"⚠️ Warning: Could not save metrics file: {e}")
 
-def model_training_pipeline():
-    """Main function to execute the model training process."""
+def model_training_pipeline(force_retrain=False):
+    """
+    Main function to execute the model training process.
+    
+    Args:
+        force_retrain: Fit a new model even if the saved one was trained on
+            identical data and hyperparameters
+    
+    Returns:
+        True if a new model was fitted, False if the saved model was reused,
+        or None if the processed data is missing
+    """
     
     X, y_true, df_full = load_and_prepare_data(PROCESSED_DATA_FILE)
     if X is None:
-        return
+        return None
 
-    # Train the model
-    model = train_isolation_forest(X)
-    
-    # Evaluate the model
-    metrics, anomaly_scores = evaluate_model(model, X, y_true)
-    
-    # Save the model artifact
-    save_model(model)
+    # Reuse the saved model when its training input is unchanged
+    fingerprint = compute_training_fingerprint(X)
+    model = None if force_retrain else load_fingerprinted_model(fingerprint)
+    reused = model is not None
     
-    # Save metrics to JSON file
-    save_metrics(metrics)
+    if reused:
+        print(f"-> Training data and parameters unchanged, reusing model: {MODEL_FILE}")
+        train_scores = None
+    else:
+        # Train the model
+        model, train_scores = train_isolation_forest(X, return_scores=True)
     
-    # Save anomaly scores and categorize risk levels for persistence
-    df_full['anomaly_score'] = -anomaly_scores
+    # Evaluate the model (reusing the training-set scores when we just fitted)
+    metrics, anomaly_scores = evaluate_model(model, X, y_true, scores=train_scores)
     
-    # Categorize risk levels based on quantiles
-    q_critical = df_full['anomaly_score'].quantile(0.99)
-    q_high = df_full['anomaly_score'].quantile(0.95)
-    q_med = df_full['anomaly_score'].quantile(0.80)
+    if reused:
+        metrics['model_last_trained'] = datetime.fromtimestamp(os.path.getmtime(MODEL_FILE)).isoformat()
     
-    def categorize_risk(score):
-        if score >= q_critical: return 'Critical'
-        if score >= q_high: return 'High'
-        if score >= q_med: return 'Medium'
-        return 'Low'
+    # The artifact writes are independent and I/O-bound, so run them concurrently
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = []
+        if not reused:
+            # Save the model artifact
+            futures.append(pool.submit(save_model, model, fingerprint))
         
-    df_full['risk_level'] = df_full['anomaly_score'].apply(categorize_risk)
-    
-    df_full.to_csv(PROCESSED_DATA_FILE, index=False)
-    print(f"✅ Updated processed data with anomaly scores and risk levels: {PROCESSED_DATA_FILE}")
+        # Save metrics to JSON file
+        futures.append(pool.submit(save_metrics, metrics))
+        
+        # Save anomaly scores to the sidecar file (risk levels are derived on load)
+        futures.append(pool.submit(save_anomaly_scores, df_full['event_id'], anomaly_scores))
+        
+        # Surface any write failure
+        for future in futures:
+            future.result()
     
     print("\n" + "=" * 50)
     print("🎉 MODEL TRAINING PIPELINE COMPLETED SUCCESSFULLY")
     print("=" * 50)
+    
+    return not reused
 
 if __name__ == "__main__":
-    model_training_pipeline()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="VORTEX Model Training")
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Refit even if the saved model was trained on identical data'
+    )
+    parser.add_argument(
+        '--sweep-estimators',
+        action='store_true',
+        help='Report AUC-ROC for a range of n_estimators instead of training'
+    )
+    
+    args = parser.parse_args()
+    
+    if args.sweep_estimators:
+        X, y_true, _ = load_and_prepare_data(PROCESSED_DATA_FILE)
+        if X is not None:
+            sweep_n_estimators(X, y_true)
+    else:
+        model_training_pipeline(force_retrain=args.force)
\ No newline at end of file
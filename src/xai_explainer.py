@@ -6,9 +6,16 @@ import joblib
 import shap
 import hashlib
 import logging
+from functools import lru_cache
 from sklearn.ensemble import IsolationForest
 from pathlib import Path
 
+# Optional: BLAKE3 is a faster integrity hash on CPUs without SHA extensions
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,7 +41,13 @@ except ImportError:
     ALLOWED_DATA_DIR = Path(DATA_DIR).resolve()
     ALLOWED_MODEL_DIR = Path(MODEL_DIR).resolve()
 
-from src.model_train import MODEL_FEATURES
+from src.data_io import (
+    MODEL_FEATURES, PROCESSED_DATA_PARQUET, ANOMALY_SCORES_FILE,
+    read_processed_features, attach_anomaly_scores
+)
+
+# Feature names as an array so explanation rows can be reordered with fancy indexing
+_MODEL_FEATURES_ARRAY = np.asarray(MODEL_FEATURES)
 
 # =============================================================================
 # FEATURE NAME MAPPING (Human Readable)
@@ -369,16 +382,96 @@ def validate_file_path(file_path, allowed_dir):
         logger.error(f"Path validation error: {e}")
         raise
 
-def verify_model_integrity(model_path, expected_hash=None):
-    """Optionally verify model file hasn't been tampered with."""
+def compute_file_hash(file_path, algorithm='sha256', chunk_size=1 << 20):
+    """Hashes a file in fixed-size chunks so it is never fully read into memory."""
+    if algorithm == 'blake3':
+        if blake3 is None:
+            raise ValueError("BLAKE3 hashing requested but the 'blake3' package is not installed.")
+        hasher = blake3.blake3()
+    else:
+        hasher = hashlib.new(algorithm)
+    
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def verify_model_integrity(model_path, expected_hash=None, algorithm='sha256'):
+    """
+    Optionally verify model file hasn't been tampered with.
+    
+    Args:
+        model_path: Path to the model artifact
+        expected_hash: Expected hex digest; verification is skipped if None
+        algorithm: 'sha256' (default) or any hashlib name, or 'blake3' if installed
+    """
     if expected_hash:
-        with open(model_path, 'rb') as f:
-            file_hash = hashlib.sha256(f.read()).hexdigest()
+        file_hash = compute_file_hash(model_path, algorithm)
         if file_hash != expected_hash:
             raise ValueError("Model file integrity check failed!")
     
+def _get_mtime(path):
+    """Returns the file's modification time, or None if it does not exist."""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+@lru_cache(maxsize=1)
+def _load_artifacts(data_path, data_mtime, model_path, model_mtime, mirror_mtime, scores_mtime):
+    """
+    Reads the processed data and model from disk and builds the SHAP explainer.
+    
+    The modification times of every file the result is read from (CSV, Parquet
+    mirror, anomaly score sidecar, model) are part of the cache key, so rewriting
+    any of them (e.g. after retraining) invalidates the cached artifacts on the
+    next call. Invalid artifacts raise instead of returning, so failures are
+    never cached.
+    """
+    
+    # Load data (only the columns the explainer needs)
+    logger.info(f"Loading data from: {data_path}")
+    required_cols = set(MODEL_FEATURES + ['event_id', 'anomaly_score'])
+    df = read_processed_features(data_path, columns=list(required_cols))
+    df = attach_anomaly_scores(df)
+    
+    # Validate required columns
+    missing_cols = required_cols - set(df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    
+    # Check for missing values in critical columns once; the result travels with
+    # the frame so the explainer can skip its own scan
+    df.attrs['has_nans'] = bool(df[MODEL_FEATURES].isna().to_numpy().any())
+    if df.attrs['has_nans']:
+        logger.warning("Missing values detected in features. Will apply imputation.")
+    
+    # Verify model integrity (optional - add hash to config if needed)
+    # verify_model_integrity(model_path, expected_hash="your_hash_here")
+    
+    # Load model
+    logger.info(f"Loading model from: {model_path}")
+    model = joblib.load(model_path)
+    
+    # Validate model type
+    if not isinstance(model, IsolationForest):
+        raise TypeError("Loaded model is not an IsolationForest instance.")
+    
+    explainer = get_tree_explainer(model)
+    
+    # Build the event_id lookup now so cached frames never pay for it per request
+    get_event_index(df)
+    
+    logger.info(f"✅ Successfully loaded {len(df)} records and model.")
+    return df, model, explainer
+
+
 def load_data_and_model():
-    """Loads the processed data (with scores) and the trained Isolation Forest model."""
+    """
+    Loads the processed data (with scores), the trained Isolation Forest model
+    and its SHAP explainer. Results are cached until any source file changes on disk.
+    
+    Returns:
+        Tuple of (df, model, explainer), or (None, None, None) if loading failed
+    """
     
     try:
         # Validate paths
@@ -388,182 +481,272 @@ def load_data_and_model():
         if not data_path.exists():
             logger.error(f"Processed data file not found: {data_path}")
             logger.error("Run 'python src/feature_engineer.py' first.")
-            return None, None
+            return None, None, None
             
         if not model_path.exists():
             logger.error(f"Trained model not found: {model_path}")
             logger.error("Run 'python src/model_train.py' first.")
-            return None, None
+            return None, None, None
 
-        # Load data
-        logger.info(f"Loading data from: {data_path}")
-        df = pd.read_csv(data_path)
-        
-        # Validate required columns
-        required_cols = set(MODEL_FEATURES + ['event_id', 'anomaly_score'])
-        missing_cols = required_cols - set(df.columns)
-        if missing_cols:
-            logger.error(f"Missing required columns: {missing_cols}")
-            return None, None
-        
-        # Check for missing values in critical columns
-        if df[MODEL_FEATURES].isnull().any().any():
-            logger.warning("Missing values detected in features. Will apply imputation.")
-        
-        # Verify model integrity (optional - add hash to config if needed)
-        # verify_model_integrity(model_path, expected_hash="your_hash_here")
-        
-        # Load model
-        logger.info(f"Loading model from: {model_path}")
-        model = joblib.load(model_path)
-        
-        # Validate model type
-        if not isinstance(model, IsolationForest):
-            logger.error("Loaded model is not an IsolationForest instance.")
-            return None, None
-        
-        logger.info(f"✅ Successfully loaded {len(df)} records and model.")
-        return df, model
+        return _load_artifacts(
+            str(data_path), os.path.getmtime(data_path),
+            str(model_path), os.path.getmtime(model_path),
+            _get_mtime(PROCESSED_DATA_PARQUET), _get_mtime(ANOMALY_SCORES_FILE)
+        )
+    
+    except (ValueError, TypeError) as e:
+        logger.error(str(e))
+        return None, None, None
         
     except Exception as e:
         logger.error(f"Error loading data/model: {e}", exc_info=True)
-        return None, None
+        return None, None, None
+
+
+# Fitted TreeExplainer keyed by id(model). The model is stored next to its
+# explainer so a recycled id() can never return an explainer for another forest.
+_EXPLAINER_CACHE = {}
+
+
+def get_tree_explainer(model):
+    """Returns a cached SHAP TreeExplainer for the model, building it on first use."""
+    cached = _EXPLAINER_CACHE.get(id(model))
+    if cached is not None and cached[0] is model:
+        return cached[1]
+
+    logger.info("Initializing SHAP TreeExplainer...")
+    # Path-dependent mode needs no background data: the per-node cover stats are
+    # read from the trees once and reused by every shap_values() call
+    explainer = shap.TreeExplainer(
+        model,
+        feature_perturbation='tree_path_dependent',
+        model_output='raw'
+    )
+
+    # Only the live model is ever explained; drop explainers of retrained ones
+    _EXPLAINER_CACHE.clear()
+    _EXPLAINER_CACHE[id(model)] = (model, explainer)
+    return explainer
+
+
+# event_id index of the most recently explained frame, keyed by id(df). The frame
+# and its length are stored too, so a recycled id() or an appended row is detected.
+_EVENT_INDEX_CACHE = {}
+
+
+def get_event_index(df):
+    """Returns a hashed Index of the frame's event_ids (as strings) for O(1) lookups."""
+    cached = _EVENT_INDEX_CACHE.get(id(df))
+    if cached is not None and cached[0] is df and cached[1] == len(df):
+        return cached[2]
+    
+    event_index = pd.Index(df['event_id'].astype(str))
+    
+    _EVENT_INDEX_CACHE.clear()
+    _EVENT_INDEX_CACHE[id(df)] = (df, len(df), event_index)
+    return event_index
+
+
+def _get_base_value(explainer):
+    """Extracts a JSON-safe float expected value from the explainer."""
+    base_value = explainer.expected_value
+    
+    # Handle base_value if it's an array
+    if isinstance(base_value, np.ndarray):
+        base_value = float(base_value[0])
+    else:
+        base_value = float(base_value)
+        
+    # Final NaN check for base_value
+    if not np.isfinite(base_value):
+        base_value = 0.0
+    return base_value
 
 
-def generate_shap_explanations(df, model, event_id=None):
+def _build_explanation(event_id, feature_values, shap_row, base_value):
     """
-    Generates SHAP values for a specific event or the entire high-risk dataset.
+    Formats the SHAP contributions of a single event for the API/Frontend.
+    
+    Args:
+        event_id: ID of the explained event
+        feature_values: Feature values of the event (ordered as MODEL_FEATURES)
+        shap_row: SHAP contributions of the event (ordered as MODEL_FEATURES)
+        base_value: Explainer expected value
+        
+    Returns:
+        Dictionary with event_id, base_value, and explanation details
+    """
+    # Resolve potential NaN issues for JSON serialization
+    values = np.nan_to_num(np.asarray(feature_values, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+    contribs = np.nan_to_num(np.asarray(shap_row, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+    
+    # In Isolation Forest, negative SHAP values indicate increased anomaly risk
+    is_increasing_risk = contribs < 0
+    
+    # Order contributions by magnitude (absolute value); stable keeps ties in feature order
+    order = np.argsort(-np.abs(contribs), kind='stable')
+    
+    # Create a structured list of contributions
+    explanation_data = [
+        {
+            'feature': feature,
+            'value_at_risk': val,
+            'shap_contribution': contrib,
+            'is_high_risk_contributor': is_risk
+        }
+        for feature, val, contrib, is_risk in zip(
+            _MODEL_FEATURES_ARRAY[order].tolist(),
+            values[order].tolist(),
+            contribs[order].tolist(),
+            is_increasing_risk[order].tolist()
+        )
+    ]
+    
+    # Generate human-readable narrative
+    narrative = AttackNarrative.generate(
+        explanation_data=explanation_data,
+        event_id=event_id,
+        top_n=5
+    )
+    
+    # Generate mitigation suggestions
+    mitigation_suggestions = get_mitigation_suggestions(
+        explanation_data=explanation_data,
+        top_n=5
+    )
+    
+    return {
+        'event_id': str(event_id),
+        'base_value': base_value,
+        'explanation': explanation_data,
+        'narrative': narrative,
+        'mitigation_suggestions': mitigation_suggestions
+    }
+
+
+def generate_batch_shap_explanations(df, model, event_ids=None, top_k=10, explainer=None):
+    """
+    Generates SHAP explanations for several events in a single explainer pass.
     
     Args:
         df: DataFrame with processed features
         model: Trained IsolationForest model
-        event_id: Optional specific event ID to explain
+        event_ids: Optional list of event IDs to explain
+        top_k: Number of highest-risk events to explain when event_ids is None
+        explainer: Optional pre-built TreeExplainer for the model
         
     Returns:
-        Dictionary with event_id, base_value, and explanation details
+        List of explanation dictionaries (one per event) or None if failed
     """
     
     try:
         logger.info("Preparing data for SHAP analysis...")
-
-        # Validate event_id type if provided
-        if event_id is not None:
-            if not isinstance(event_id, (str, int, np.integer)):
-                logger.error(f"Invalid event_id type: {type(event_id)}")
-                return None
         
-        # Filter data to only include the features the model was trained on
-        X = df[MODEL_FEATURES].copy()
-        
-        # Handle missing values
-        if X.isnull().any().any():
-            logger.warning("NaN values detected. Filling with median.")
-            X = X.fillna(X.median())
-
-        # Initialize the SHAP Explainer
-        logger.info("Initializing SHAP TreeExplainer...")
-        explainer = shap.TreeExplainer(model)
-        
-        # Find the event to explain
-        if event_id is not None:
-            # Cast column and search ID to string for robust matching
-            event_id_str = str(event_id)
-            event_data = df[df['event_id'].astype(str) == event_id_str]
-            if event_data.empty:
-                logger.error(f"Event ID {event_id} not found in dataset.")
+        if event_ids is not None:
+            invalid = [e for e in event_ids if not isinstance(e, (str, int, np.integer))]
+            if invalid:
+                logger.error(f"Invalid event_id type: {type(invalid[0])}")
+                return None
+            
+            # Cast column and search IDs to string for robust matching
+            requested = [str(e) for e in event_ids]
+            event_index = get_event_index(df)
+            positions = event_index.get_indexer_for(requested)
+            selected = df.iloc[positions[positions >= 0]]
+            
+            missing = [e for e in requested if e not in event_index]
+            if missing:
+                logger.error(f"Event ID(s) {sorted(missing)} not found in dataset.")
+            if selected.empty:
                 return None
             
-            X_explain = X.loc[event_data.index]
-            logger.info(f"Generating explanation for Event ID: {event_id}")
+            logger.info(f"Generating explanations for {len(selected)} event(s)")
         
         else:
-            # Default: Explain the single highest-risk event
             if 'anomaly_score' not in df.columns:
                 logger.error("anomaly_score column not found. Run model training first.")
                 return None
-                
-            highest_risk_event_idx = df.sort_values(by='anomaly_score', ascending=False).index[0]
-            event_id = df.loc[highest_risk_event_idx, 'event_id']
-            X_explain = X.loc[[highest_risk_event_idx]]
-
-            logger.info(f"No event_id specified. Explaining highest risk event: {event_id}")
-
+            
+            # Single O(N) pass for the top event, partial heap selection for top-K
+            if top_k == 1:
+                selected = df.loc[[df['anomaly_score'].idxmax()]]
+            else:
+                selected = df.nlargest(top_k, 'anomaly_score')
+            logger.info(f"No event_ids specified. Explaining top {len(selected)} highest risk events")
+        
+        # Filter data to only include the features the model was trained on
+        X_explain = selected[MODEL_FEATURES]
+        
+        # Handle missing values (frames from load_data_and_model already know if any exist)
+        if df.attrs.get('has_nans', True) and X_explain.isna().to_numpy().any():
+            logger.warning("NaN values detected. Filling with median.")
+            X_explain = X_explain.fillna(df[MODEL_FEATURES].median())
+        
         # Final safety check on X_explain (ensure no NaNs reach the explainer)
         X_explain = X_explain.fillna(0)
-
-        # Calculate SHAP values
+        
+        if explainer is None:
+            explainer = get_tree_explainer(model)
+        
+        # Calculate SHAP values for every selected row at once (the tree
+        # explainer works in float32, so cast once up front)
         logger.info("Calculating SHAP values...")
-        shap_values = explainer.shap_values(X_explain)
+        shap_values = explainer.shap_values(X_explain.astype(np.float32))
         
         # Handle list output (some versions of SHAP return lists)
         if isinstance(shap_values, list):
             shap_values = shap_values[0]
-
-        # Format Explanation for API/Frontend
-        explanation_data = []
-        base_value = explainer.expected_value
-        
-        # Handle base_value if it's an array
-        if isinstance(base_value, np.ndarray):
-            base_value = float(base_value[0])
-        else:
-            base_value = float(base_value)
-            
-        # Final NaN check for base_value
-        if not np.isfinite(base_value):
-            base_value = 0.0
-        
-        # Create a structured list of contributions
-        for i, feature in enumerate(MODEL_FEATURES):
-            # Resolve potential NaN issues for JSON serialization
-            val = float(X_explain.iloc[0][feature])
-            contrib = float(shap_values[0][i])
-            
-            if not np.isfinite(val): val = 0.0
-            if not np.isfinite(contrib): contrib = 0.0
-            
-            # In Isolation Forest, negative SHAP values indicate increased anomaly risk
-            is_increasing_risk = contrib < 0
-            
-            explanation_data.append({
-                'feature': feature,
-                'value_at_risk': val,
-                'shap_contribution': contrib, 
-                'is_high_risk_contributor': bool(is_increasing_risk)
-            })
-        
-        # Sort contributions by magnitude (absolute value)
-        explanation_data.sort(key=lambda x: abs(x['shap_contribution']), reverse=True)
-        
-        # Generate human-readable narrative
-        narrative = AttackNarrative.generate(
-            explanation_data=explanation_data,
-            event_id=event_id,
-            top_n=5
-        )
         
-        # Generate mitigation suggestions
-        mitigation_suggestions = get_mitigation_suggestions(
-            explanation_data=explanation_data,
-            top_n=5
-        )
+        base_value = _get_base_value(explainer)
+        # Report values from the float64 frame, not the float32 SHAP input
+        feature_values = X_explain.to_numpy(dtype=float)
         
-        result = {
-            'event_id': str(event_id),
-            'base_value': base_value,
-            'explanation': explanation_data,
-            'narrative': narrative,
-            'mitigation_suggestions': mitigation_suggestions
-        }
+        explanations = [
+            _build_explanation(event_id, feature_values[row_idx], shap_values[row_idx, :], base_value)
+            for row_idx, event_id in enumerate(selected['event_id'].tolist())
+        ]
         
-        logger.info("✅ SHAP explanation generated successfully")
-        return result
+        logger.info(f"✅ SHAP explanations generated for {len(explanations)} event(s)")
+        return explanations
         
     except Exception as e:
         logger.error(f"Error generating SHAP explanations: {e}", exc_info=True)
         return None
 
 
+def generate_shap_explanations(df, model, event_id=None, explainer=None):
+    """
+    Generates SHAP values for a specific event or the highest-risk event.
+    
+    Args:
+        df: DataFrame with processed features
+        model: Trained IsolationForest model
+        event_id: Optional specific event ID to explain
+        explainer: Optional pre-built TreeExplainer for the model
+        
+    Returns:
+        Dictionary with event_id, base_value, and explanation details
+    """
+    
+    # Validate event_id type if provided
+    if event_id is not None and not isinstance(event_id, (str, int, np.integer)):
+        logger.error(f"Invalid event_id type: {type(event_id)}")
+        return None
+    
+    if event_id is None:
+        logger.info("No event_id specified. Explaining highest risk event.")
+        explanations = generate_batch_shap_explanations(df, model, top_k=1, explainer=explainer)
+    else:
+        logger.info(f"Generating explanation for Event ID: {event_id}")
+        explanations = generate_batch_shap_explanations(
+            df, model, event_ids=[event_id], explainer=explainer
+        )
+    
+    if not explanations:
+        return None
+    return explanations[0]
+
+
 def xai_pipeline(event_id=None, df=None, model=None):
     """
     Main pipeline function to run the XAI explanation.
@@ -583,17 +766,19 @@ def xai_pipeline(event_id=None, df=None, model=None):
         logger.info("=" * 60)
         
         # Load data and model if not provided
+        explainer = None
         if df is None or model is None:
-            df_disk, model_disk = load_data_and_model()
+            df_disk, model_disk, explainer_disk = load_data_and_model()
             df = df if df is not None else df_disk
-            model = model if model is not None else model_disk
+            if model is None:
+                model, explainer = model_disk, explainer_disk
 
         if df is None or model is None:
             logger.error("Failed to load data or model. Exiting pipeline.")
             return None
 
         # Generate explanation
-        explanation = generate_shap_explanations(df, model, event_id)
+        explanation = generate_shap_explanations(df, model, event_id, explainer=explainer)
         
         if explanation:
             logger.info("-" * 60)
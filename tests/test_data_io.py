@@ -0,0 +1,74 @@
+"""
+Unit Tests for Processed Data I/O
+
+Tests the anomaly score sidecar helpers for:
+- Sidecar scores taking precedence over scores in the frame
+- Frame scores filling events the sidecar does not cover
+- Frames without a sidecar passing through unchanged
+
+Author: VORTEX Team
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.data_io import save_anomaly_scores, attach_anomaly_scores
+
+
+class TestAttachAnomalyScores:
+    """Test suite for joining sidecar anomaly scores onto processed data."""
+
+    @pytest.fixture
+    def scores_path(self, tmp_path):
+        """Sidecar from a training run that scored EVT_000 - EVT_002."""
+        path = str(tmp_path / 'anomaly_scores.parquet')
+        save_anomaly_scores(['EVT_000', 'EVT_001', 'EVT_002'], [0.10, 0.20, 0.30], scores_path=path)
+        return path
+
+    def test_sidecar_overrides_frame_scores(self, scores_path):
+        """Scores from the latest training run replace stale in-frame scores."""
+        df = pd.DataFrame({
+            'event_id': ['EVT_000', 'EVT_001', 'EVT_002'],
+            'anomaly_score': [9.0, 9.0, 9.0]
+        })
+
+        result = attach_anomaly_scores(df, scores_path=scores_path)
+
+        assert result['anomaly_score'].tolist() == pytest.approx([0.10, 0.20, 0.30])
+
+    def test_frame_scores_fill_unscored_events(self, scores_path):
+        """Simulator-injected events keep the score written into the CSV."""
+        df = pd.DataFrame({
+            'event_id': ['EVT_000', 'sim_001', 'EVT_002', 'sim_002'],
+            'anomaly_score': [9.0, 0.75, 9.0, 0.85]
+        })
+
+        result = attach_anomaly_scores(df, scores_path=scores_path)
+
+        assert result['anomaly_score'].tolist() == pytest.approx([0.10, 0.75, 0.30, 0.85])
+
+    def test_unscored_events_without_frame_scores_are_nan(self, scores_path):
+        """Without an in-frame column, events missing from the sidecar get NaN."""
+        df = pd.DataFrame({'event_id': ['EVT_001', 'sim_001']})
+
+        result = attach_anomaly_scores(df, scores_path=scores_path)
+
+        assert result['anomaly_score'].iloc[0] == pytest.approx(0.20)
+        assert np.isnan(result['anomaly_score'].iloc[1])
+
+    def test_missing_sidecar_leaves_frame_unchanged(self, tmp_path):
+        """Before any training run, the frame's own scores are used as-is."""
+        df = pd.DataFrame({
+            'event_id': ['EVT_000', 'sim_001'],
+            'anomaly_score': [0.5, 0.75]
+        })
+
+        result = attach_anomaly_scores(df, scores_path=str(tmp_path / 'missing.parquet'))
+
+        assert result['anomaly_score'].tolist() == [0.5, 0.75]
@@ -0,0 +1,156 @@
+"""
+Unit Tests for Model Training
+
+Tests the Isolation Forest training pipeline for:
+- Post-hoc ANOMALY_RATE threshold matching sklearn's contamination fit
+- float32 feature matrices fitting the same forest as float64 ones
+- Reusing the saved model only while its training fingerprint matches
+
+Author: VORTEX Team
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import roc_auc_score
+
+from src import model_train
+from src.model_train import (
+    MODEL_FEATURES, MODEL_PARAMS, ANOMALY_RATE, RANDOM_STATE,
+    train_isolation_forest
+)
+
+
+@pytest.fixture
+def feature_matrix():
+    """Seeded feature matrix: 2000 normal events plus a small outlying cluster."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    normal = rng.normal(0.0, 1.0, size=(2000, len(MODEL_FEATURES)))
+    outliers = rng.normal(4.0, 1.0, size=(60, len(MODEL_FEATURES)))
+    values = np.round(np.vstack([normal, outliers]), 3).astype(np.float32)
+    return pd.DataFrame(values, columns=MODEL_FEATURES)
+
+
+class TestPostHocThreshold:
+    """Test suite for fitting with contamination='auto' and thresholding afterwards."""
+
+    def test_offset_matches_contamination_fit(self, feature_matrix):
+        """Post-hoc offset_ equals the one sklearn computes for contamination=ANOMALY_RATE."""
+        reference = IsolationForest(**{**MODEL_PARAMS, 'contamination': ANOMALY_RATE})
+        reference.fit(feature_matrix)
+
+        model = train_isolation_forest(feature_matrix)
+
+        assert model.offset_ == pytest.approx(reference.offset_, rel=1e-12)
+
+    def test_predictions_match_contamination_fit(self, feature_matrix):
+        """Both fits flag exactly the same events as outliers."""
+        reference = IsolationForest(**{**MODEL_PARAMS, 'contamination': ANOMALY_RATE})
+        reference.fit(feature_matrix)
+
+        model = train_isolation_forest(feature_matrix)
+
+        np.testing.assert_array_equal(model.predict(feature_matrix), reference.predict(feature_matrix))
+
+
+class TestFloat32Features:
+    """Test suite for training on float32 instead of float64 features."""
+
+    def test_float32_fit_matches_float64(self, feature_matrix):
+        """Same scores, predictions and AUC-ROC whichever dtype the features arrive in."""
+        y_true = np.r_[np.zeros(2000, dtype=int), np.ones(60, dtype=int)]
+        # The fixture's 3-decimal values, parsed to float64 as the CSV reader used to
+        X64 = pd.DataFrame(np.round(feature_matrix.to_numpy(dtype=np.float64), 3), columns=MODEL_FEATURES)
+
+        model_32, scores_32 = train_isolation_forest(feature_matrix, return_scores=True)
+        model_64, scores_64 = train_isolation_forest(X64, return_scores=True)
+
+        np.testing.assert_allclose(scores_32, scores_64)
+        np.testing.assert_array_equal(model_32.predict(feature_matrix), model_64.predict(X64))
+        assert roc_auc_score(y_true, -scores_32) == pytest.approx(roc_auc_score(y_true, -scores_64))
+
+
+class TestFingerprintReuse:
+    """Test suite for skipping the fit when the training input is unchanged."""
+
+    @pytest.fixture
+    def pipeline(self, monkeypatch, tmp_path, feature_matrix):
+        """Runs model_training_pipeline against tmp artifacts, counting fits."""
+        model_file = str(tmp_path / 'isolation_forest_model.pkl')
+        monkeypatch.setattr(model_train, 'MODEL_FILE', model_file)
+        monkeypatch.setattr(model_train, 'FINGERPRINT_FILE', model_file + '.fp')
+        monkeypatch.setattr(model_train, 'save_metrics', lambda metrics: None)
+        monkeypatch.setattr(model_train, 'save_anomaly_scores', lambda *args, **kwargs: None)
+
+        data = {'X': feature_matrix}
+
+        def load(filepath):
+            X = data['X']
+            y_true = pd.Series(np.r_[np.zeros(2000, dtype=int), np.ones(60, dtype=int)])
+            df = pd.DataFrame({'event_id': [f'EVT_{i:04d}' for i in range(len(X))]})
+            return X, y_true, df
+
+        monkeypatch.setattr(model_train, 'load_and_prepare_data', load)
+
+        fits = []
+        train = model_train.train_isolation_forest
+
+        def counting_train(X, return_scores=False):
+            fits.append(len(X))
+            return train(X, return_scores=return_scores)
+
+        monkeypatch.setattr(model_train, 'train_isolation_forest', counting_train)
+
+        # Initial fit writes the model and its fingerprint
+        assert model_train.model_training_pipeline() is True
+        assert len(fits) == 1
+
+        return data, fits, model_file
+
+    def test_matching_fingerprint_reuses_model(self, pipeline):
+        """Unchanged data and parameters load the saved model without fitting."""
+        data, fits, model_file = pipeline
+
+        assert model_train.model_training_pipeline() is False
+        assert len(fits) == 1
+
+    def test_force_retrain_fits(self, pipeline):
+        """force_retrain=True fits even when the fingerprint matches."""
+        data, fits, model_file = pipeline
+
+        assert model_train.model_training_pipeline(force_retrain=True) is True
+        assert len(fits) == 2
+
+    def test_changed_data_refits(self, pipeline):
+        """A single changed feature value invalidates the fingerprint."""
+        data, fits, model_file = pipeline
+        X = data['X'].copy()
+        X.iloc[0, 0] += 1.0
+        data['X'] = X
+
+        assert model_train.model_training_pipeline() is True
+        assert len(fits) == 2
+
+    def test_changed_params_refit(self, pipeline, monkeypatch):
+        """Changing a hyperparameter invalidates the fingerprint."""
+        data, fits, model_file = pipeline
+        monkeypatch.setitem(model_train.MODEL_PARAMS, 'n_estimators', model_train.MODEL_PARAMS['n_estimators'] + 10)
+
+        assert model_train.model_training_pipeline() is True
+        assert len(fits) == 2
+
+    def test_model_newer_than_fingerprint_refits(self, pipeline):
+        """A model written after its fingerprint (e.g. API auto-retrain) is not reused."""
+        data, fits, model_file = pipeline
+        fp_mtime = os.path.getmtime(model_file + '.fp')
+        os.utime(model_file, (fp_mtime + 10, fp_mtime + 10))
+
+        assert model_train.model_training_pipeline() is True
+        assert len(fits) == 2